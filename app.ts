@@ -1,6 +1,8 @@
 'use strict';
 
 import Homey from 'homey';
+import { BaseCandleDevice } from './lib/BaseCandleDevice';
+import { IRBroadcast } from './lib/IRBroadcast';
 
 module.exports = class CandleLightApp extends Homey.App {
 
@@ -9,22 +11,61 @@ module.exports = class CandleLightApp extends Homey.App {
 
     const allCandlesCard = this.homey.flow.getActionCard('all_candles');
     allCandlesCard.registerRunListener(async (args) => {
-      const state = args.state === 'on' ? 'on' : 'off';
-      const capabilityId = state === 'on' ? 'button.on' : 'button.off';
-      const driverIds = this.getCandleDriverIds();
+      const value = args.state === 'on';
+      const devices = this.getCandleDevices();
+
+      // Candles sharing a code and antenna are switched by a single frame
+      const plan = IRBroadcast.plan(devices.map((device) => ({
+        target: device,
+        commands: device.getCommandSet(),
+        command: value ? 'ON' as const : 'OFF' as const,
+        antenna: this.getSatelliteAntennaId(device),
+        repetitions: device.getSetting('ir_repetitions'),
+      })));
+
+      this.log(
+        `[${this.constructor.name}] Broadcast ${value ? 'ON' : 'OFF'}: ${plan.frames.length} frame(s) for ${devices.length} candle(s),`,
+        `saved ${plan.savedFrames} frame(s) / ${plan.savedAirtimeMs}ms airtime`,
+      );
+
+      if (plan.unordered.length > 0) {
+        const codes = plan.unordered.map((frame) => `0x${frame.code.toString(16).toUpperCase().padStart(2, '0')}`).join(', ');
+        this.log(`[${this.constructor.name}] Warning: colliding codes form a cycle, candles switched by ${codes} may end on another brand's button`);
+      }
+
+      for (const frame of plan.frames) {
+        const code = `0x${frame.code.toString(16).toUpperCase().padStart(2, '0')}`;
+        if (frame.collisions.length > 0) {
+          const usages = frame.collisions.map((usage) => `${usage.brand}.${usage.command}`).join(', ');
+          this.log(`[${this.constructor.name}] Code ${code} also triggers ${usages}`);
+        }
 
-      for (const driverId of driverIds) {
-        const driver = this.getDriverSafe(driverId);
-        if (!driver) {
+        // Fall back to the other targets when the sender fails
+        const senders = [frame.sender, ...frame.targets.filter((device) => device !== frame.sender)];
+        let sent = false;
+        for (const sender of senders) {
+          try {
+            sent = await sender.ir.sendCommandRawQueued(frame.code);
+            if (!sent) {
+              this.log(`[${this.constructor.name}] ${sender.getName()} could not send ${code}`);
+            }
+          } catch (error) {
+            this.error(`[${this.constructor.name}] ${sender.getName()} failed to send ${code}`, error);
+          }
+          if (sent) break;
+        }
+
+        if (!sent) {
+          const names = frame.targets.map((device) => device.getName()).join(', ');
+          this.error(`[${this.constructor.name}] Failed to send ${code} for ${names}`);
           continue;
         }
 
-        const devices = driver.getDevices();
-        for (const device of devices) {
+        for (const device of frame.targets) {
           try {
-            await device.triggerCapabilityListener(capabilityId, true);
+            await device.updateOnOffState(value);
           } catch (error) {
-            this.error(`[${this.constructor.name}] Failed to set ${capabilityId} for ${device.getName()}`, error);
+            this.error(`[${this.constructor.name}] Failed to update ${device.getName()}`, error);
           }
         }
       }
@@ -77,6 +118,16 @@ module.exports = class CandleLightApp extends Homey.App {
     ];
   }
 
+  private getCandleDevices(silentDrivers: boolean = false): BaseCandleDevice[] {
+    const devices: BaseCandleDevice[] = [];
+    for (const driverId of this.getCandleDriverIds()) {
+      const driver = this.getDriverSafe(driverId, silentDrivers);
+      if (!driver) continue;
+      devices.push(...driver.getDevices());
+    }
+    return devices;
+  }
+
   private getUniqueSatelliteAntennas(silentDrivers: boolean = false): string[] {
     const antennas = new Set<string>();
     const driverIds = this.getCandleDriverIds();
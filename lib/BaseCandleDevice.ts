@@ -134,10 +134,17 @@ export abstract class BaseCandleDevice extends Homey.Device {
     await this.ir.sendCommandRawQueued(commandCode);
   }
 
+  /**
+   * Get the IR command set of this device, used for broadcasts to all candles
+   */
+  getCommandSet(): CommandSet {
+    return this.getCommands();
+  }
+
   /**
    * Keep the onoff capability in sync when available
    */
-  private async updateOnOffState(value: boolean): Promise<void> {
+  async updateOnOffState(value: boolean): Promise<void> {
     if (!this.hasCapability('onoff')) return;
 
     try {
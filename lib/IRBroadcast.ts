@@ -0,0 +1,265 @@
+import { IR_COMMANDS, CommandSet } from './ir-commands';
+import { IRUtils } from './IRUtils';
+
+/**
+ * IR Broadcast Planner
+ * Deduplicates identical NEC telegrams when one command is sent to many candles
+ */
+
+export type CommandName = keyof CommandSet;
+
+/**
+ * A button of a command set that sends a given telegram
+ */
+export interface CommandUsage {
+  brand: string;
+  command: CommandName;
+}
+
+/**
+ * A telegram that means different buttons on different command sets
+ */
+export interface CommandCollision {
+  address: number;
+  code: number;
+  usages: CommandUsage[];
+}
+
+/**
+ * A device that should receive a command during a broadcast
+ */
+export interface BroadcastTarget<T> {
+  target: T;
+  commands: CommandSet;
+  command: CommandName;
+  address?: number;
+  antenna?: string | null;
+  repetitions?: number;
+}
+
+/**
+ * A single telegram to transmit, covering all targets that share it
+ */
+export interface BroadcastFrame<T> {
+  address: number;
+  code: number;
+  antenna: string | null;
+  repetitions: number;
+  sender: T;
+  targets: T[];
+  collisions: CommandUsage[];
+}
+
+export interface BroadcastPlan<T> {
+  frames: BroadcastFrame<T>[];
+  naiveFrames: number;
+  savedFrames: number;
+  savedAirtimeMs: number;
+  /** Frames sent before a colliding frame because the collisions form a cycle */
+  unordered: BroadcastFrame<T>[];
+}
+
+export class IRBroadcast {
+
+  // NEC timings in µs, see .homeycompose/signals/ir/nec.json
+  private static readonly SOF_US = 9000 + 4500;
+  private static readonly EOF_US = 560;
+  private static readonly ZERO_US = 560 + 560;
+  private static readonly ONE_US = 560 + 1690;
+
+  private static readonly DEFAULT_REPETITIONS = 3;
+
+  /**
+   * Index all command sets by telegram
+   * @param commandSets Command sets to index (default: all brands)
+   * @returns Map of telegram key to the buttons that send it
+   */
+  static indexCommandSets(
+    commandSets: Record<string, CommandSet> = IR_COMMANDS,
+    address: number = 0x00,
+  ): Map<number, CommandUsage[]> {
+    const index = new Map<number, CommandUsage[]>();
+
+    for (const [brand, commands] of Object.entries(commandSets)) {
+      for (const [command, code] of Object.entries(commands)) {
+        if (code === undefined) continue;
+
+        const key = this.telegramKey(code, address);
+        const usages = index.get(key) || [];
+        usages.push({ brand, command: command as CommandName });
+        index.set(key, usages);
+      }
+    }
+
+    return index;
+  }
+
+  /**
+   * Find telegrams that mean different buttons on different brands
+   * @param commandSets Command sets to check (default: all brands)
+   */
+  static findCollisions(
+    commandSets: Record<string, CommandSet> = IR_COMMANDS,
+    address: number = 0x00,
+  ): CommandCollision[] {
+    const collisions: CommandCollision[] = [];
+
+    for (const [key, usages] of this.indexCommandSets(commandSets, address)) {
+      const commands = new Set(usages.map((usage) => usage.command));
+      if (commands.size > 1) {
+        collisions.push({ address: key >> 8, code: key & 0xFF, usages });
+      }
+    }
+
+    return collisions;
+  }
+
+  /**
+   * Build a deduplicated transmit plan for a broadcast
+   * Targets sharing antenna, address and code are covered by a single frame.
+   * A frame that triggers another button on a targeted brand is ordered
+   * before the frames of that brand, so the affected candles end on their
+   * own command. When the collisions form a cycle, the first frame of the
+   * cycle in device order is sent anyway and listed in `unordered`.
+   * @param targets Devices and the command each should receive
+   */
+  static plan<T>(targets: BroadcastTarget<T>[]): BroadcastPlan<T> {
+    const commandSets: Record<string, CommandSet> = {};
+    for (const target of targets) {
+      commandSets[this.brandOf(target.commands)] = target.commands;
+    }
+
+    const frames = new Map<string, BroadcastFrame<T>>();
+    const frameBrands = new Map<BroadcastFrame<T>, Set<string>>();
+    let naiveAirtimeUs = 0;
+
+    for (const target of targets) {
+      const code = target.commands[target.command];
+      if (code === undefined) continue;
+
+      const address = target.address ?? 0x00;
+      const antenna = target.antenna ?? null;
+      const repetitions = target.repetitions || this.DEFAULT_REPETITIONS;
+      naiveAirtimeUs += this.frameAirtimeUs(code, address) * repetitions;
+
+      const key = `${antenna}:${this.telegramKey(code, address)}`;
+      const brand = this.brandOf(target.commands);
+      const frame = frames.get(key);
+      if (!frame) {
+        const created: BroadcastFrame<T> = {
+          address,
+          code,
+          antenna,
+          repetitions,
+          sender: target.target,
+          targets: [target.target],
+          collisions: [],
+        };
+        frames.set(key, created);
+        frameBrands.set(created, new Set([brand]));
+        continue;
+      }
+
+      frame.targets.push(target.target);
+      frameBrands.get(frame)!.add(brand);
+      // The device with the most repetitions sends, so every candle gets enough
+      if (repetitions > frame.repetitions) {
+        frame.repetitions = repetitions;
+        frame.sender = target.target;
+      }
+    }
+
+    const addresses = new Set(Array.from(frames.values(), (frame) => frame.address));
+    const indexes = new Map<number, Map<number, CommandUsage[]>>();
+    for (const address of addresses) {
+      indexes.set(address, this.indexCommandSets(commandSets, address));
+    }
+
+    const planned = Array.from(frames.values());
+    let plannedAirtimeUs = 0;
+    for (const frame of planned) {
+      const intended = new Set(
+        targets
+          .filter((target) => frame.targets.includes(target.target))
+          .map((target) => target.command),
+      );
+      const usages = indexes.get(frame.address)!.get(this.telegramKey(frame.code, frame.address)) || [];
+      frame.collisions = usages.filter((usage) => !intended.has(usage.command));
+      plannedAirtimeUs += this.frameAirtimeUs(frame.code, frame.address) * frame.repetitions;
+    }
+
+    const { ordered, unordered } = this.orderFrames(planned, frameBrands);
+
+    return {
+      frames: ordered,
+      naiveFrames: targets.length,
+      savedFrames: targets.length - planned.length,
+      savedAirtimeMs: Math.round((naiveAirtimeUs - plannedAirtimeUs) / 1000),
+      unordered,
+    };
+  }
+
+  /**
+   * Topological sort: a frame that triggers a button on brand B goes before
+   * every frame sent to B, otherwise device order is kept
+   * @param frames Frames in device order
+   * @param frameBrands Brands of the targets of each frame
+   */
+  private static orderFrames<T>(
+    frames: BroadcastFrame<T>[],
+    frameBrands: Map<BroadcastFrame<T>, Set<string>>,
+  ): { ordered: BroadcastFrame<T>[]; unordered: BroadcastFrame<T>[] } {
+    const before = new Map<BroadcastFrame<T>, Set<BroadcastFrame<T>>>(
+      frames.map((frame) => [frame, new Set()]),
+    );
+    for (const frame of frames) {
+      const brands = new Set(frame.collisions.map((usage) => usage.brand));
+      for (const other of frames) {
+        if (other === frame) continue;
+        if (Array.from(frameBrands.get(other)!).some((brand) => brands.has(brand))) {
+          before.get(other)!.add(frame);
+        }
+      }
+    }
+
+    const ordered: BroadcastFrame<T>[] = [];
+    const unordered: BroadcastFrame<T>[] = [];
+    const remaining = [...frames];
+    while (remaining.length > 0) {
+      let index = remaining.findIndex(
+        (frame) => Array.from(before.get(frame)!).every((other) => ordered.includes(other)),
+      );
+      // Cycle: break it at the first frame in device order
+      if (index === -1) {
+        index = 0;
+        unordered.push(remaining[0]);
+      }
+      ordered.push(...remaining.splice(index, 1));
+    }
+
+    return { ordered, unordered };
+  }
+
+  /**
+   * Airtime of a single NEC frame in µs
+   * @param code Command code
+   * @param address Address (default: 0x00)
+   */
+  static frameAirtimeUs(code: number, address: number = 0x00): number {
+    const bits = IRUtils.necCommandToHomeyBits(code, address);
+    const ones = bits.filter((bit) => bit === 1).length;
+    return this.SOF_US + ones * this.ONE_US + (bits.length - ones) * this.ZERO_US + this.EOF_US;
+  }
+
+  /**
+   * Name of a command set in IR_COMMANDS, or 'CUSTOM' when it is not listed
+   */
+  static brandOf(commands: CommandSet): string {
+    const entry = Object.entries(IR_COMMANDS).find(([, set]) => set === commands);
+    return entry ? entry[0] : 'CUSTOM';
+  }
+
+  private static telegramKey(code: number, address: number): number {
+    return ((address & 0xFF) << 8) | (code & 0xFF);
+  }
+}
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+YS-IRTM Serial Capture Recorder
+Records received serial chunks with monotonic nanosecond timestamps to a
+compact append-only binary log, and replays a log through a pty at 1x, Nx
+or maximum speed so parsers can be tested without pressing remote buttons.
+
+Log format (little-endian):
+- Header: b'IRTM' magic, 1 byte version
+- Records: uint64 timestamp (ns, time.monotonic_ns), uint16 length, data
+- A record with length 0 starts a recording session; timestamps are only
+  comparable within a session
+"""
+
+import argparse
+import fcntl
+import os
+import struct
+import sys
+import termios
+import time
+import tty
+
+MAGIC = b'IRTM'
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+RECORD = struct.Struct('<QH')
+
+BAUD_RATE = 9600
+
+# Pause between consecutive sessions on the replay timeline
+SESSION_GAP = 1_000_000_000
+
+
+def open_log(path):
+    """
+    Open a log for appending, writing the header when the file is new.
+
+    Every call starts a new session, so a later recording is not replayed
+    with the wall-clock gap (or a reboot's clock reset) in between.
+    """
+    log = open(path, 'ab')
+    if log.tell() == 0:
+        log.write(HEADER)
+    write_record(log, time.monotonic_ns(), b'')
+    return log
+
+
+def write_record(log, timestamp, data):
+    """Append a single received chunk to the log."""
+    log.write(RECORD.pack(timestamp, len(data)) + data)
+    log.flush()
+
+
+def read_log(path):
+    """
+    Read all records from a log.
+
+    Yields:
+        Tuple (timestamp_ns, data), data is empty for a session start;
+        a truncated trailing record is skipped
+    """
+    with open(path, 'rb') as log:
+        header = log.read(len(HEADER))
+        if len(header) < len(HEADER) or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a YS-IRTM capture log")
+        if header[len(MAGIC)] != VERSION:
+            raise ValueError(f"Unsupported log version {header[len(MAGIC)]}")
+
+        while True:
+            prefix = log.read(RECORD.size)
+            if len(prefix) < RECORD.size:
+                return
+            timestamp, length = RECORD.unpack(prefix)
+            data = log.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, data
+
+
+def timeline(records):
+    """
+    Place records on one continuous clock.
+
+    Each session starts at its first chunk, SESSION_GAP after the last chunk
+    of the previous session. A timestamp going backwards without a session
+    record (a reboot in a log without markers) also starts a session.
+
+    Yields:
+        Tuple (session, offset_ns, data)
+    """
+    session = 0
+    base = origin = last = None
+    new_session = True
+    for timestamp, data in records:
+        if not data:
+            new_session = True
+            continue
+        if new_session or timestamp < base:
+            if last is not None:
+                session += 1
+                origin = last + SESSION_GAP
+            else:
+                origin = 0
+            base = timestamp
+            new_session = False
+        last = origin + timestamp - base
+        yield session, last, data
+
+
+def pending(fd):
+    """Number of bytes waiting to be read on a tty."""
+    return struct.unpack('i', fcntl.ioctl(fd, termios.FIONREAD, b'\0' * 4))[0]
+
+
+def wait_drained(fd, settle=0.2):
+    """
+    Wait until the consumer has read everything written to the pty.
+
+    The pty hands written data to the reading side asynchronously, so the
+    queue must stay empty for `settle` seconds.
+    """
+    empty_since = None
+    waiting = False
+    while True:
+        if pending(fd):
+            empty_since = None
+            if not waiting:
+                waiting = True
+                print("Waiting for the consumer to read the remaining data (Ctrl+C to close)", flush=True)
+        elif empty_since is None:
+            empty_since = time.monotonic()
+        elif time.monotonic() - empty_since >= settle:
+            return
+        time.sleep(0.02)
+
+
+def format_chunk(data):
+    """Format a chunk like ir-test.py does for complete NEC frames."""
+    if len(data) == 3:
+        addr, cmd = data[0], data[2]
+        return f"RX - Addr: 0x{addr:02x}, Cmd: 0x{cmd:02x}"
+    return f"RX - {data.hex(' ')}"
+
+
+def record(args):
+    """Record serial traffic until interrupted."""
+    import serial
+
+    ser = serial.Serial(
+        port=args.port,
+        baudrate=args.baud,
+        bytesize=serial.EIGHTBITS,
+        parity=serial.PARITY_NONE,
+        stopbits=serial.STOPBITS_ONE,
+        timeout=0.1
+    )
+    print(f"Recording {args.port} to {args.log} (Ctrl+C to stop)")
+
+    chunks = size = 0
+    with open_log(args.log) as log:
+        try:
+            while True:
+                data = ser.read(ser.in_waiting or 1)
+                if not data:
+                    continue
+                write_record(log, time.monotonic_ns(), data)
+                chunks += 1
+                size += len(data)
+                if not args.quiet:
+                    print(format_chunk(data))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ser.close()
+
+    print(f"\nRecorded {chunks} chunks ({size} bytes)")
+
+
+def replay(args):
+    """Replay a log through a pty."""
+    records = list(timeline(read_log(args.log)))
+    if not records:
+        print(f"No records in {args.log}")
+        return
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    if speed is not None and speed <= 0:
+        sys.exit("Speed must be a positive number or 'max'")
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    print(f"Serial consumer port: {os.ttyname(slave)}", flush=True)
+    if args.delay:
+        print(f"Starting replay in {args.delay}s...", flush=True)
+        time.sleep(args.delay)
+
+    start = time.perf_counter_ns()
+    size = 0
+    try:
+        for _, offset, data in records:
+            if speed is not None:
+                wait = start + offset / speed - time.perf_counter_ns()
+                if wait > 0:
+                    time.sleep(wait / 1e9)
+            os.write(master, data)
+            size += len(data)
+    except OSError as e:
+        print(f"Replay stopped: {e}")
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+
+    print(f"Replayed {len(records)} chunks ({size} bytes) in {elapsed:.3f}s"
+          f" ({len(records) / max(elapsed, 1e-9):.0f} chunks/s)", flush=True)
+
+    # Closing the master drops unread bytes and hangs up the consumer
+    try:
+        wait_drained(slave)
+        if not args.close:
+            print("Holding port open (Ctrl+C to close)", flush=True)
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def dump(args):
+    """Print the records of a log."""
+    session = None
+    for index, offset, data in timeline(read_log(args.log)):
+        if index != session:
+            session = index
+            print(f"--- session {session + 1}")
+        print(f"{offset / 1e6:12.3f}ms  {format_chunk(data)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay YS-IRTM serial traffic")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="Record received chunks to a log")
+    rec.add_argument("port", help="Serial port of the YS-IRTM module")
+    rec.add_argument("log", help="Capture log to append to")
+    rec.add_argument("--baud", type=int, default=BAUD_RATE,
+                     help=f"Baud rate (default: {BAUD_RATE})")
+    rec.add_argument("--quiet", action="store_true",
+                     help="Do not print received chunks")
+    rec.set_defaults(func=record)
+
+    rep = commands.add_parser("replay", help="Replay a log through a pty")
+    rep.add_argument("log", help="Capture log to replay")
+    rep.add_argument("--speed", default="1",
+                     help="Playback speed factor, or 'max' for no delays (default: 1)")
+    rep.add_argument("--delay", type=float, default=2.0,
+                     help="Seconds to wait for the consumer to open the port (default: 2)")
+    rep.add_argument("--close", action="store_true",
+                     help="Close the port once the consumer has read everything, "
+                          "instead of holding it open until Ctrl+C")
+    rep.set_defaults(func=replay)
+
+    dmp = commands.add_parser("dump", help="Print the records of a log")
+    dmp.add_argument("log", help="Capture log to print")
+    dmp.set_defaults(func=dump)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
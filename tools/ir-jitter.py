@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+NEC IR Timing Jitter Analyzer
+Computes mark/space distributions, jitter and decode margins over a corpus of
+Tasmota raw captures and recommends sensitivity and threshold values for nec.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+# Nominal NEC timings in µs (see .homeycompose/signals/ir/nec.json)
+MARK_SYMBOLS = {
+    'bit_mark': 560,
+    'header_mark': 9000,
+}
+SPACE_SYMBOLS = {
+    'zero_space': 560,
+    'one_space': 1690,
+    'repeat_space': 2250,
+    'header_space': 4500,
+}
+
+# Spaces are classified by the mark in front of them: a header mark is
+# followed by a header or repeat space, a bit mark by a zero or one space
+DATA_SPACES = ('zero_space', 'one_space')
+LEADER_SPACES = ('repeat_space', 'header_space')
+
+# Symbols that make up the nec.json `words`, used for the sensitivity advice
+WORD_SYMBOLS = ('bit_mark', 'zero_space', 'one_space')
+
+# Spaces above this are frame gaps, marks above this are noise
+MAX_SPACE = 7000
+MAX_MARK = 13500
+
+PERCENTILES = (1, 5, 50, 95, 99)
+
+# Corpus files are parsed in blocks of this many bytes
+CHUNK_SIZE = 1 << 24
+
+# Longer numbers are treated as out of range gaps
+MAX_DIGITS = 6
+
+SYMBOLS = (*MARK_SYMBOLS, *SPACE_SYMBOLS)
+NOMINALS = {**MARK_SYMBOLS, **SPACE_SYMBOLS}
+
+# Numbers are parsed eight ASCII bytes at a time (SWAR), the guard keeps the
+# word in front of the first number in bounds
+GUARD = b'\n' * 8
+ASCII_ZEROS = np.uint64(0x3030303030303030)
+# Mask of the last n bytes of a little-endian word, i.e. an n digit number
+NUMBER_MASKS = np.array([(2**64 - 1) << (64 - 8 * n) & (2**64 - 1) for n in range(9)], dtype=np.uint64)
+
+
+def build_lookup():
+    """
+    Precompute the symbol index for every (group, duration) pair.
+
+    Groups are marks, spaces after a bit mark and spaces after a header
+    mark. Decision boundaries are the geometric midpoints between nominals,
+    so a symbol's tolerance scales with its length. Out of range durations
+    map to -1.
+    """
+    lookup = np.full((3, MAX_MARK + 2), -1, dtype=np.int32)
+    durations = np.arange(MAX_MARK + 2)
+    for group, (names, limit) in enumerate((
+        (tuple(MARK_SYMBOLS), MAX_MARK),
+        (DATA_SPACES, MAX_SPACE),
+        (LEADER_SPACES, MAX_SPACE),
+    )):
+        table = np.array([NOMINALS[n] for n in names], dtype=np.float64)
+        slots = np.searchsorted(np.sqrt(table[:-1] * table[1:]), durations)
+        indices = np.array([SYMBOLS.index(n) for n in names])[slots]
+        lookup[group, :limit + 1] = indices[:limit + 1]
+    return lookup
+
+
+LOOKUP = build_lookup()
+
+
+def iter_chunks(paths, size=CHUNK_SIZE):
+    """Yield corpus data as bytes that always end on a line break."""
+    for path in paths:
+        rest = b''
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(size)
+                if not block:
+                    break
+                block = rest + block
+                cut = block.rfind(b'\n') + 1
+                if cut:
+                    rest = block[cut:]
+                    yield block[:cut]
+                else:
+                    rest = block
+        if rest.strip():
+            yield rest + b'\n'
+
+
+def parse_numbers(buf, ends, lengths):
+    """
+    Parse the numbers ending in front of `ends` with a single gather.
+
+    The eight bytes in front of every end are read as one little-endian
+    word and the bytes that are not part of the number are replaced by ASCII
+    zeros. Adjacent digits are combined into 2 digit lanes, which two
+    multiplications fold into the 8 digit value in the upper half.
+    """
+    words = np.ndarray((buf.size - 7,), dtype='<u8', buffer=buf, strides=(1,))
+    x = words[ends - 8]
+    mask = NUMBER_MASKS[np.minimum(lengths, 8)]
+    x &= mask
+    mask &= ASCII_ZEROS
+    x -= mask
+
+    low = x >> np.uint64(8)
+    x *= np.uint64(10)
+    x += low
+    high = x >> np.uint64(16)
+    high &= np.uint64(0x000000FF000000FF)
+    high *= np.uint64(1 + (10000 << 32))
+    x &= np.uint64(0x000000FF000000FF)
+    x *= np.uint64(100 + (1000000 << 32))
+    x += high
+    x >>= np.uint64(32)
+    values = x.astype(np.int32)
+    values[lengths > MAX_DIGITS] = MAX_MARK + 1
+    return values
+
+
+def parse_chunk(data):
+    """
+    Parse Tasmota raw captures (one per line) without a Python level loop.
+
+    Every non-digit byte ends a number, spaces and carriage returns are
+    dropped first. Captures are the ranges of numbers between line breaks.
+
+    Returns:
+        Tuple (durations, is_mark, capture_count)
+    """
+    buf = np.frombuffer(GUARD + data.translate(None, b' \r'), dtype=np.uint8)
+    separators = np.flatnonzero((buf < 0x30) | (buf > 0x39))
+    lengths = np.diff(separators) - 1
+    ends = separators[1:]
+
+    # Empty numbers (",,") are skipped
+    present = lengths > 0
+    if not present.all():
+        ends, lengths = ends[present], lengths[present]
+    if not ends.size:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=bool), 0
+    values = parse_numbers(buf, ends, lengths)
+
+    # Numbers per line, empty lines are skipped
+    bounds = np.searchsorted(ends, np.flatnonzero(buf == 0x0A), 'right')
+    sizes = np.diff(bounds)
+    starts = bounds[:-1][sizes > 0]
+    sizes = sizes[sizes > 0]
+
+    # Tasmota prefixes raw data with a 0, which shifts the mark/space parity
+    leading_zero = values[starts] == 0
+    is_mark = np.zeros(values.size, dtype=bool)
+    is_mark[::2] = True
+    is_mark ^= np.repeat(((starts + leading_zero) & 1).astype(bool), sizes)
+
+    if leading_zero.any():
+        keep = np.ones(values.size, dtype=bool)
+        keep[starts[leading_zero]] = False
+        values, is_mark = values[keep], is_mark[keep]
+    return values, is_mark, starts.size
+
+
+def classify(durations, is_mark):
+    """
+    Assign every duration to its nearest nominal symbol.
+
+    Spaces only compete with the symbols that can follow the preceding mark:
+    a header mark is followed by a header or repeat space, a bit mark by a
+    zero or one space.
+
+    Returns:
+        Histogram matrix of shape (len(SYMBOLS), MAX_MARK + 2), indexed by µs
+    """
+    width = MAX_MARK + 2
+    mark_edge = np.sqrt(MARK_SYMBOLS['bit_mark'] * MARK_SYMBOLS['header_mark'])
+    after_header = np.roll(durations, 1) > mark_edge
+
+    group = np.where(is_mark, 0, 1 + after_header.astype(np.int32))
+    clipped = np.minimum(durations, width - 1)
+    symbol = LOOKUP[group, clipped]
+
+    valid = symbol >= 0
+    keys = symbol[valid] * width + clipped[valid]
+    return np.bincount(keys, minlength=len(SYMBOLS) * width).reshape(len(SYMBOLS), width)
+
+
+def load_histograms(paths):
+    """
+    Stream a capture corpus into per-symbol duration histograms.
+
+    Returns:
+        Tuple (histograms, capture_count, duration_count)
+    """
+    histograms = np.zeros((len(SYMBOLS), MAX_MARK + 2), dtype=np.int64)
+    captures = durations_seen = 0
+    for buf in iter_chunks(paths):
+        durations, is_mark, count = parse_chunk(buf)
+        histograms += classify(durations, is_mark)
+        captures += count
+        durations_seen += durations.size
+    return histograms, captures, durations_seen
+
+
+def weighted_percentile(values, weights, q):
+    """Nearest-rank percentiles of `values` occurring `weights` times."""
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    ranks = np.ceil(np.asarray(q, dtype=np.float64) / 100 * cumulative[-1])
+    indices = np.searchsorted(cumulative, np.maximum(ranks, 1))
+    return values[order][indices]
+
+
+def percentile_dict(values, weights):
+    """Percentiles in PERCENTILES as a report dict."""
+    return {
+        f'p{p}': float(v)
+        for p, v in zip(PERCENTILES, weighted_percentile(values, weights, PERCENTILES))
+    }
+
+
+def symbol_stats(name, histogram, sensitivity):
+    """Distribution and jitter statistics for a single symbol."""
+    nominal = NOMINALS[name]
+    count = int(histogram.sum())
+    if not count:
+        return {'symbol': name, 'nominal': nominal, 'count': 0}
+
+    durations = np.arange(histogram.size, dtype=np.float64)
+    used = np.flatnonzero(histogram)
+    mean = float(durations @ histogram / count)
+    deviation = np.abs(durations - nominal) / nominal
+
+    return {
+        'symbol': name,
+        'nominal': nominal,
+        'count': count,
+        'mean': mean,
+        'std': float(np.sqrt(((durations - mean) ** 2) @ histogram / count)),
+        'min': int(used[0]),
+        'max': int(used[-1]),
+        'percentiles': percentile_dict(durations, histogram),
+        'jitter': percentile_dict(deviation, histogram),
+        'outside_tolerance': float(histogram[deviation > sensitivity].sum() / count),
+    }
+
+
+def decode_margins(zero, one, coverage):
+    """
+    Find the zero/one space threshold with the largest margin on both sides.
+
+    The threshold sits halfway between the `coverage` percentile of the zero
+    spaces and the matching low percentile of the one spaces.
+    """
+    if not zero.any() or not one.any():
+        return None
+
+    durations = np.arange(zero.size, dtype=np.float64)
+    zero_high = float(weighted_percentile(durations, zero, coverage))
+    one_low = float(weighted_percentile(durations, one, 100 - coverage))
+    threshold = (zero_high + one_low) / 2
+    nominal_threshold = (SPACE_SYMBOLS['zero_space'] + SPACE_SYMBOLS['one_space']) / 2
+
+    margins = np.concatenate((threshold - durations, durations - threshold))
+
+    def errors(t):
+        return int(zero[durations > t].sum() + one[durations <= t].sum())
+
+    return {
+        'threshold': round(threshold),
+        'nominal_threshold': nominal_threshold,
+        'margin': round((one_low - zero_high) / 2),
+        'margin_percentiles': percentile_dict(margins, np.concatenate((zero, one))),
+        'errors_at_threshold': errors(threshold),
+        'errors_at_nominal': errors(nominal_threshold),
+    }
+
+
+def recommend(histograms, coverage, safety):
+    """
+    Recommend nec.json timings and sensitivity from the measured symbols.
+
+    The sensitivity covers the `coverage` percentile of the word jitter with a
+    safety factor, capped where the 560/1690 space windows would overlap.
+    """
+    durations = np.arange(histograms.shape[1], dtype=np.float64)
+    words = [SYMBOLS.index(name) for name in WORD_SYMBOLS]
+    if not histograms[words].any():
+        return None
+
+    deviations = np.concatenate([
+        np.abs(durations - NOMINALS[SYMBOLS[i]]) / NOMINALS[SYMBOLS[i]] for i in words
+    ])
+    zero, one = SPACE_SYMBOLS['zero_space'], SPACE_SYMBOLS['one_space']
+    limit = (one - zero) / (one + zero)
+    required = float(weighted_percentile(deviations, histograms[words].ravel(), coverage))
+    sensitivity = min(required * safety, limit)
+
+    def median(name):
+        histogram = histograms[SYMBOLS.index(name)]
+        if not histogram.any():
+            return NOMINALS[name]
+        return int(round(float(weighted_percentile(durations, histogram, 50)), -1))
+
+    return {
+        'sensitivity': round(sensitivity, 2),
+        'required_sensitivity': round(required, 3),
+        'sensitivity_limit': round(limit, 3),
+        'fits': required * safety <= limit,
+        'sof': [median('header_mark'), median('header_space')],
+        'eof': [median('bit_mark')],
+        'words': [
+            [median('bit_mark'), median('zero_space')],
+            [median('bit_mark'), median('one_space')],
+        ],
+    }
+
+
+def analyze(paths, sensitivity=0.5, coverage=99.9, safety=1.25):
+    """
+    Analyze a capture corpus.
+
+    Returns:
+        dict with per-symbol statistics, decode margins and recommendations
+    """
+    histograms, captures, durations = load_histograms(paths)
+
+    return {
+        'captures': captures,
+        'durations': durations,
+        'symbols': [
+            symbol_stats(name, histograms[i], sensitivity)
+            for i, name in enumerate(SYMBOLS)
+        ],
+        'margins': decode_margins(
+            histograms[SYMBOLS.index('zero_space')],
+            histograms[SYMBOLS.index('one_space')],
+            coverage,
+        ),
+        'recommendation': recommend(histograms, coverage, safety),
+    }
+
+
+def print_report(result, elapsed):
+    """Print a human readable report."""
+    print("NEC IR Timing Jitter Analyzer")
+    print("=" * 60)
+    print(f"Captures: {result['captures']}, durations: {result['durations']} ({elapsed:.2f}s)")
+
+    for stats in result['symbols']:
+        print(f"\n{stats['symbol']} (nominal {stats['nominal']}µs):")
+        if not stats['count']:
+            print("  No samples")
+            continue
+        pct = stats['percentiles']
+        jit = stats['jitter']
+        print(f"  Count: {stats['count']}, mean: {stats['mean']:.0f}µs, std: {stats['std']:.0f}µs")
+        print(f"  Range: {stats['min']}-{stats['max']}µs")
+        print("  Timing: " + ", ".join(f"{k}={v:.0f}" for k, v in pct.items()))
+        print("  Jitter: " + ", ".join(f"{k}={v * 100:.1f}%" for k, v in jit.items()))
+        print(f"  Outside current sensitivity: {stats['outside_tolerance'] * 100:.3f}%")
+
+    margins = result['margins']
+    if margins:
+        print("\nDecode margins (zero/one space):")
+        print(f"  Threshold: {margins['threshold']}µs (nominal {margins['nominal_threshold']:.0f}µs)")
+        print(f"  Margin: ±{margins['margin']}µs")
+        print("  Margin percentiles: "
+              + ", ".join(f"{k}={v:.0f}" for k, v in margins['margin_percentiles'].items()))
+        print(f"  Bit errors: {margins['errors_at_threshold']} at threshold, "
+              f"{margins['errors_at_nominal']} at nominal")
+
+    rec = result['recommendation']
+    if rec:
+        print("\nRecommendation for nec.json:")
+        print(f"  sensitivity: {rec['sensitivity']} "
+              f"(required {rec['required_sensitivity']}, limit {rec['sensitivity_limit']})")
+        if not rec['fits']:
+            print("  Warning: jitter exceeds the separable limit, captures are unreliable")
+        print(f"  sof: {rec['sof']}")
+        print(f"  eof: {rec['eof']}")
+        print(f"  words: {rec['words']}")
+
+    print("\n" + "=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze NEC IR timing jitter over Tasmota raw captures")
+    parser.add_argument("corpus", nargs="+",
+                        help="Files with one Tasmota raw capture per line")
+    parser.add_argument("--sensitivity", type=float, default=0.5,
+                        help="Current nec.json sensitivity to evaluate (default: 0.5)")
+    parser.add_argument("--coverage", type=float, default=99.9,
+                        help="Percentile of samples the recommendation must cover (default: 99.9)")
+    parser.add_argument("--safety", type=float, default=1.25,
+                        help="Safety factor applied to the required sensitivity (default: 1.25)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the result as JSON")
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = analyze(args.corpus, args.sensitivity, args.coverage, args.safety)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result, elapsed)
+
+
+if __name__ == "__main__":
+    main()
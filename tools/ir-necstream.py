@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+NEC IR Stream Decoder
+Decodes NEC frames and repeat codes from a raw timing stream, groups the
+repeats of a held button into press events and reports the repeat count and
+hold duration of each press.
+
+Input is a stream of alternating mark/space durations in µs, separated by
+commas or whitespace, e.g. Tasmota raw captures. A 0 restarts the stream on a
+mark, so Tasmota's leading 0 is handled; a line break does the same, so each
+line can hold one capture. Hold durations only include the gaps that are part
+of the stream.
+"""
+
+import argparse
+import json
+import os
+import re
+import select
+import statistics
+import sys
+import tempfile
+
+# Nominal NEC timings in µs (see .homeycompose/signals/ir/nec.json)
+HEADER_MARK = 9000
+HEADER_SPACE = 4500
+REPEAT_SPACE = 2250
+BIT_MARK = 560
+ZERO_SPACE = 560
+ONE_SPACE = 1690
+
+# A press ends after this much silence (NEC repeats every ~108ms)
+HOLD_TIMEOUT = 150000
+
+# Numbers and line breaks; every line break restarts the stream on a mark
+TOKEN = re.compile(rb'\d+|\n')
+PARTIAL = re.compile(rb'\d+\Z')
+
+
+class NECStreamDecoder:
+    """Incremental NEC decoder, fed one duration at a time."""
+
+    IDLE, LEADER_SPACE, BIT_MARK, BIT_SPACE, STOP_MARK, GAP = range(6)
+
+    def __init__(self, tolerance=0.35, hold_timeout=HOLD_TIMEOUT):
+        self.tolerance = tolerance
+        self.hold_timeout = hold_timeout
+        self.threshold = (ZERO_SPACE + ONE_SPACE) / 2
+        self.leader_edge = (HEADER_SPACE * REPEAT_SPACE) ** 0.5
+
+        self.state = self.IDLE
+        self.expect_mark = True
+        self.now = 0
+        self.frame_start = 0
+        self.bits = 0
+        self.bit_count = 0
+        self.repeat = False
+        self.press = None
+        self.errors = 0
+        self.orphan_repeats = 0
+
+    def matches(self, duration, nominal):
+        """Check a duration against its nominal value with the tolerance."""
+        return abs(duration - nominal) <= nominal * self.tolerance
+
+    def feed(self, duration):
+        """
+        Feed the next duration.
+
+        Returns:
+            List of press events that ended with this duration
+        """
+        events = []
+        if duration == 0:
+            self.expect_mark = True
+            return events
+
+        is_mark = self.expect_mark
+        self.expect_mark = not is_mark
+        start = self.now
+        self.now += duration
+
+        if self.state == self.GAP:
+            # Any space after the stop mark is the gap to the next frame
+            self.state = self.IDLE
+            if not is_mark:
+                if duration > self.hold_timeout:
+                    events.extend(self.close())
+                return events
+
+        elif self.state == self.LEADER_SPACE:
+            if not is_mark and (self.matches(duration, REPEAT_SPACE) or self.matches(duration, HEADER_SPACE)):
+                self.repeat = duration < self.leader_edge
+                self.bits = self.bit_count = 0
+                self.state = self.STOP_MARK if self.repeat else self.BIT_MARK
+                return events
+            self.abort()
+
+        elif self.state == self.BIT_MARK:
+            if is_mark and self.matches(duration, BIT_MARK):
+                self.state = self.BIT_SPACE
+                return events
+            self.abort()
+
+        elif self.state == self.BIT_SPACE:
+            if not is_mark and duration <= ONE_SPACE * (1 + self.tolerance):
+                self.bits |= (duration > self.threshold) << self.bit_count
+                self.bit_count += 1
+                self.state = self.STOP_MARK if self.bit_count == 32 else self.BIT_MARK
+                return events
+            self.abort()
+
+        elif self.state == self.STOP_MARK:
+            # Accept any stop mark: the nec-pronto Repeat ends on a 9000µs mark
+            if is_mark:
+                self.state = self.GAP
+                return events + (self.on_repeat() if self.repeat else self.on_frame())
+            self.abort()
+
+        # Idle, or resynchronizing after a malformed frame
+        if is_mark and self.matches(duration, HEADER_MARK):
+            self.frame_start = start
+            self.state = self.LEADER_SPACE
+        return events
+
+    def on_frame(self):
+        """A full frame ended: it starts a new press."""
+        events = self.close()
+        address = self.bits & 0xFF
+        address_inv = (self.bits >> 8) & 0xFF
+        command = (self.bits >> 16) & 0xFF
+        command_inv = (self.bits >> 24) & 0xFF
+
+        if command_inv != (~command & 0xFF):
+            self.errors += 1
+            return events
+
+        # Extended NEC uses the inverse byte as a second address byte
+        if address_inv != (~address & 0xFF):
+            address |= address_inv << 8
+
+        self.press = {
+            'address': address,
+            'command': command,
+            'start': self.frame_start,
+            'end': self.now,
+            'repeats': 0,
+        }
+        return events
+
+    def on_repeat(self):
+        """A repeat code ended: it extends the current press."""
+        if self.press is None:
+            self.orphan_repeats += 1
+        else:
+            self.press['repeats'] += 1
+            self.press['end'] = self.now
+        return []
+
+    def abort(self):
+        """Drop a malformed frame."""
+        self.errors += 1
+        self.state = self.IDLE
+
+    def close(self):
+        """End the current press, if any."""
+        if self.press is None:
+            return []
+        press = self.press
+        self.press = None
+        duration = press['end'] - press['start']
+        return [{
+            'address': press['address'],
+            'command': press['command'],
+            'repeats': press['repeats'],
+            'duration_ms': duration / 1000,
+            'start_ms': press['start'] / 1000,
+        }]
+
+    def restart(self):
+        """
+        Line break: the next duration is a mark.
+
+        A frame cut off by the line break is counted as malformed.
+        """
+        if self.state not in (self.IDLE, self.GAP):
+            self.errors += 1
+        self.state = self.IDLE
+        self.expect_mark = True
+
+    def flush(self):
+        """End of stream: drop a partial frame and end the current press."""
+        self.state = self.IDLE
+        return self.close()
+
+    def idle(self):
+        """Silence on a live stream: end the current press."""
+        if self.state in (self.GAP, self.IDLE):
+            self.state = self.IDLE
+            return self.close()
+        return []
+
+
+def read_live(fd, timeout):
+    """
+    Yield chunks from a file descriptor as they arrive.
+
+    Yields None after `timeout` seconds of silence.
+    """
+    while True:
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            yield None
+            continue
+        data = os.read(fd, 65536)
+        if not data:
+            return
+        yield data
+
+
+def read_files(paths):
+    """Yield the contents of capture files, each ending on a line break."""
+    for path in paths:
+        with open(path, 'rb') as f:
+            yield f.read()
+        # A file without a trailing line break must not run into the next one
+        yield b'\n'
+
+
+def decode_stream(decoder, chunks):
+    """
+    Feed byte chunks to a decoder.
+
+    Yields:
+        Press events as they end; a None chunk means silence on a live stream
+    """
+    rest = b''
+    for chunk in chunks:
+        if chunk is None:
+            yield from decoder.idle()
+            continue
+        data = rest + chunk
+        # Keep a trailing partial number for the next chunk
+        match = PARTIAL.search(data)
+        rest = match.group() if match else b''
+        data = data[:len(data) - len(rest)]
+        for token in TOKEN.findall(data):
+            if token == b'\n':
+                decoder.restart()
+            else:
+                yield from decoder.feed(int(token))
+
+    if rest:
+        yield from decoder.feed(int(rest))
+    yield from decoder.flush()
+
+
+def build_frame(address, command):
+    """Timings of a full NEC frame, ending on the stop mark."""
+    timings = [HEADER_MARK, HEADER_SPACE]
+    for byte_value in (address, ~address & 0xFF, command, ~command & 0xFF):
+        for i in range(8):
+            timings += [BIT_MARK, ONE_SPACE if (byte_value >> i) & 1 else ZERO_SPACE]
+    return timings + [BIT_MARK]
+
+
+def check():
+    """
+    Decode a stream of two presses, one capture per line without Tasmota's
+    leading 0, fed whole, in chunks split at line breaks and inside numbers,
+    and from one file per capture without a trailing line break.
+
+    Returns:
+        True when all checks pass
+    """
+    repeat = [HEADER_MARK, REPEAT_SPACE, BIT_MARK]
+    first = build_frame(0x00, 0x45) + [40000]
+    for _ in range(3):
+        first += repeat + [96000]
+    lines = [first[:-1], build_frame(0x00, 0x47)]
+    data = b''.join(b','.join(str(t).encode() for t in line) + b'\n' for line in lines)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i, line in enumerate(data.splitlines()):
+            paths.append(os.path.join(directory, f'capture{i}.txt'))
+            with open(paths[-1], 'wb') as f:
+                f.write(line)
+        splits = {
+            'whole': [data],
+            'line breaks': [line + b'\n' for line in data.splitlines()],
+            'numbers': [data[i:i + 7] for i in range(0, len(data), 7)],
+            'files': list(read_files(paths)),
+        }
+
+    ok = True
+    expected = [(0x45, 3), (0x47, 0)]
+    reference = None
+    for name, chunks in splits.items():
+        decoder = NECStreamDecoder()
+        events = list(decode_stream(decoder, chunks))
+        presses = [(e['command'], e['repeats']) for e in events]
+        durations = [e['duration_ms'] for e in events]
+        reference = reference or durations
+        passed = presses == expected and durations == reference and decoder.errors == 0
+        print(f"  {name}: {'ok' if passed else 'FAILED'} {presses} {durations}, errors: {decoder.errors}")
+        ok = ok and passed
+    return ok
+
+
+def format_address(address):
+    """Format a standard (8 bit) or extended (16 bit) NEC address."""
+    return f"0x{address:04X}" if address > 0xFF else f"0x{address:02X}"
+
+
+def format_event(event):
+    """Format a press event for the console."""
+    return (f"Addr: {format_address(event['address'])}, Cmd: 0x{event['command']:02X}"
+            f"  repeats: {event['repeats']:3d}  hold: {event['duration_ms']:8.1f}ms")
+
+
+def summarize(events):
+    """Per-command repeat and hold statistics."""
+    groups = {}
+    for event in events:
+        groups.setdefault((event['address'], event['command']), []).append(event)
+
+    summary = []
+    for (address, command), presses in sorted(groups.items()):
+        repeats = [p['repeats'] for p in presses]
+        durations = [p['duration_ms'] for p in presses]
+        summary.append({
+            'address': address,
+            'command': command,
+            'presses': len(presses),
+            'repeats_min': min(repeats),
+            'repeats_median': statistics.median(repeats),
+            'repeats_max': max(repeats),
+            'duration_ms_min': min(durations),
+            'duration_ms_max': max(durations),
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode NEC presses and repeat codes from raw IR timings")
+    parser.add_argument("captures", nargs="*",
+                        help="Capture files; reads a live stream from stdin when omitted")
+    parser.add_argument("--tolerance", type=float, default=0.35,
+                        help="Relative timing tolerance (default: 0.35)")
+    parser.add_argument("--timeout", type=float, default=HOLD_TIMEOUT / 1000,
+                        help=f"Silence in ms that ends a press (default: {HOLD_TIMEOUT // 1000})")
+    parser.add_argument("--json", action="store_true",
+                        help="Print events and summary as JSON lines")
+    parser.add_argument("--check", action="store_true",
+                        help="Decode a built-in stream split in different ways")
+
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+
+    decoder = NECStreamDecoder(args.tolerance, args.timeout * 1000)
+    if args.captures:
+        chunks = read_files(args.captures)
+    else:
+        chunks = read_live(sys.stdin.fileno(), args.timeout / 1000)
+
+    events = []
+    try:
+        for event in decode_stream(decoder, chunks):
+            events.append(event)
+            print(json.dumps(event) if args.json else format_event(event), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+    summary = summarize(events)
+    if args.json:
+        print(json.dumps({'summary': summary, 'errors': decoder.errors,
+                          'orphan_repeats': decoder.orphan_repeats}))
+        return
+
+    print("\n" + "=" * 60)
+    for row in summary:
+        print(f"Addr: {format_address(row['address'])}, Cmd: 0x{row['command']:02X}"
+              f"  presses: {row['presses']}"
+              f"  repeats: {row['repeats_min']}-{row['repeats_max']} (median {row['repeats_median']})"
+              f"  hold: {row['duration_ms_min']:.1f}-{row['duration_ms_max']:.1f}ms")
+    print(f"Malformed frames: {decoder.errors}, repeats without frame: {decoder.orphan_repeats}")
+
+
+if __name__ == "__main__":
+    main()
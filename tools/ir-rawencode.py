@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Tasmota IR Raw Encoder for Krinner Lumix IR Remote
+Builds raw IR timing data in Tasmota irsend format (the counterpart of ir-rawdecode.py)
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+# Frame layout in µs, derived from the captures in ir-rawdecode.py
+HEADER = (2000, 1000)
+TRAILER = (2000, 5600)
+SHORT = 400
+LONG = 1000
+
+# Byte layout (LSB first): bits 0-2 fixed, bits 3-4 channel, bits 5-6 command
+FIXED_BITS = 0x05
+CHANNELS = {'A': 1, 'B': 3, 'C': 2, 'D': 0}
+COMMANDS = {'off': 0, 'on': 3, 'flicker': 2}
+
+REPETITIONS = 3
+
+
+def encode_byte(channel, command):
+    """Combine channel and command into the Krinner frame byte."""
+    return FIXED_BITS | (CHANNELS[channel] << 3) | (COMMANDS[command] << 5)
+
+
+def build_frame(byte_value):
+    """
+    Build the timings of a single Krinner Lumix IR frame.
+
+    Frame structure:
+    - Header: 2000µs mark, 1000µs space
+    - Data bits: 8 bits LSB first as mark-space pairs
+      - space: ~1000µs for 1, ~400µs for 0
+      - mark: ~1000µs after a 0 bit, ~400µs otherwise
+    - End: 2000µs mark, 5600µs gap
+
+    The end mark is only observed after a 0 in bit 7, which holds for every
+    channel/command combination.
+    """
+    timings = list(HEADER)
+    previous = 1
+    for i in range(8):
+        bit = (byte_value >> i) & 1
+        timings.append(LONG if previous == 0 else SHORT)
+        timings.append(LONG if bit else SHORT)
+        previous = bit
+    timings.extend(TRAILER)
+    return timings
+
+
+# All 256 frames are built once, encoding is a lookup afterwards
+FRAME_TEMPLATES = np.array([build_frame(b) for b in range(256)], dtype=np.int32)
+FRAME_TEMPLATES.setflags(write=False)
+FRAME_STRINGS = tuple(','.join(map(str, frame)) for frame in FRAME_TEMPLATES.tolist())
+RAW_TEMPLATES = tuple('0,' + ','.join([frame] * REPETITIONS) for frame in FRAME_STRINGS)
+
+
+def encode_timings(byte_value, repetitions=REPETITIONS):
+    """Timing array of a byte repeated `repetitions` times (without the leading 0)."""
+    return np.tile(FRAME_TEMPLATES[byte_value], repetitions)
+
+
+def encode_raw(byte_value, repetitions=REPETITIONS):
+    """Tasmota irsend raw string for a byte."""
+    if repetitions == REPETITIONS:
+        return RAW_TEMPLATES[byte_value]
+    return '0,' + ','.join([FRAME_STRINGS[byte_value]] * repetitions)
+
+
+def encode_bulk(byte_values, repetitions=REPETITIONS):
+    """
+    Encode many bytes at once.
+
+    Returns:
+        int32 array of shape (len(byte_values), repetitions * frame length)
+    """
+    frames = FRAME_TEMPLATES[np.asarray(byte_values, dtype=np.uint8)]
+    return np.tile(frames, (1, repetitions))
+
+
+def encode_bulk_raw(byte_values, repetitions=REPETITIONS):
+    """Tasmota irsend raw strings for many bytes."""
+    if repetitions == REPETITIONS:
+        return [RAW_TEMPLATES[b] for b in byte_values]
+    templates = [encode_raw(b, repetitions) for b in range(256)]
+    return [templates[b] for b in byte_values]
+
+
+def load_decoder():
+    """Import ir-rawdecode.py, which cannot be imported by name."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ir-rawdecode.py')
+    spec = importlib.util.spec_from_file_location('ir_rawdecode', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def check():
+    """
+    Round-trip every frame through decode_tasmota_raw and compare the
+    encoded examples with the captures in ir-rawdecode.py.
+
+    Returns:
+        True when all checks pass
+    """
+    decoder = load_decoder()
+    ok = True
+
+    failed = []
+    for byte_value in range(256):
+        result = decoder.decode_tasmota_raw(encode_raw(byte_value))
+        if result.get('byte') != byte_value or result.get('frames_decoded') != REPETITIONS:
+            failed.append(f'0x{byte_value:02X}')
+    print(f"Round-trip: {256 - len(failed)}/256 frames decoded")
+    if failed:
+        print(f"  Failed: {', '.join(failed)}")
+        ok = False
+
+    for name, raw_data in decoder.EXAMPLES.items():
+        command, _, channel = name.rpartition('_channel_')
+        expected = np.array(decoder.parse_tasmota_raw(raw_data)[1:])
+        encoded = encode_timings(encode_byte(channel, command))
+        if expected.shape != encoded.shape:
+            print(f"  {name}: length {encoded.size}, expected {expected.size}")
+            ok = False
+            continue
+        # The captures drift by up to 100µs, e.g. 1100µs instead of 1000µs
+        drift = int(np.abs(expected - encoded).max())
+        print(f"  {name}: max drift {drift}µs")
+        ok = ok and drift <= 100
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode Krinner Lumix IR frames to Tasmota raw data")
+    parser.add_argument("--channel", choices=CHANNELS, help="Channel A-D")
+    parser.add_argument("--command", choices=COMMANDS, help="Command")
+    parser.add_argument("--byte", type=lambda v: int(v, 0),
+                        help="Raw frame byte instead of channel/command, e.g. 0x6D")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS,
+                        help=f"Number of frames (default: {REPETITIONS})")
+    parser.add_argument("--check", action="store_true",
+                        help="Round-trip all frames through ir-rawdecode.py")
+
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+
+    if args.byte is not None:
+        byte_value = args.byte & 0xFF
+    elif args.channel and args.command:
+        byte_value = encode_byte(args.channel, args.command)
+    else:
+        parser.error("--byte or both --channel and --command are required")
+
+    print(f"Byte: 0x{byte_value:02X} = {byte_value:08b}")
+    print(encode_raw(byte_value, args.repetitions))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,11 @@ Stephan Schuurman, 2025-11
 """
 
 import serial
+import sys
 import time
 
-# Serial port configuration
-SERIAL_PORT = "/dev/cu.usbmodem5A320002981"
+# Serial port configuration (pass a port, e.g. an ir-capture.py replay pty, to override)
+SERIAL_PORT = sys.argv[1] if len(sys.argv) > 1 else "/dev/cu.usbmodem5A320002981"
 BAUD_RATE = 9600
 
 ser = serial.Serial(